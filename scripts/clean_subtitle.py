@@ -18,15 +18,46 @@ Options:
     --help                 Show this help message
 """
 
+import io
 import json
 import argparse
+import mmap
 import sys
 import re
+from itertools import groupby
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Iterable, Iterator, Optional
 import logging
 from datetime import datetime
 
+# Optional: google-re2 provides a linear-time matching engine; the stdlib
+# backtracking engine is used when it is not installed
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Optional: pysimdjson parses large JSON3 files with SIMD acceleration and
+# only materializes the fields that are actually visited
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Optional: orjson decodes JSON3 bytes faster than the stdlib json module
+# and is used when pysimdjson is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: pyahocorasick matches all paragraph-indicator words in one pass
+# over each sentence instead of one substring scan per word
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,11 +66,110 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Precompiled regex patterns (compiling once at import time avoids the
+# per-call cache lookup overhead of the re.sub(pattern, ...) form)
+# Single alternation for [music]-style brackets, parentheses and HTML-like
+# tags so the text is walked once instead of three times
+_ARTIFACTS_RE = re.compile(r'\[.*?\]|\(.*?\)|<.*?>')
+# One combined pass fixing punctuation spacing: drop whitespace before
+# sentence punctuation and insert a space when a word follows it directly
+_PUNCT_SPACING_RE = re.compile(r'\s+([.!?])(\w)?|([.!?])(\w)')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_ZH_SQUASH_RE = re.compile(r'([\u4e00-\u9fff])\s+([\u4e00-\u9fff])')
+_ZH_BEFORE_LATIN_RE = re.compile(r'([\u4e00-\u9fff])([a-zA-Z0-9])')
+_LATIN_BEFORE_ZH_RE = re.compile(r'([a-zA-Z0-9])([\u4e00-\u9fff])')
+_JA_SQUASH_RE = re.compile(r'([\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff])\s+([\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff])')
+_KO_SQUASH_RE = re.compile(r'([가-힣])\s+([가-힣])')
+
+# RE2 variants of the artifact and CJK-space patterns (no lookaround, explicit
+# negated classes to keep matching linear); only built when re2 is available
+if re2 is not None:
+    _ARTIFACTS_RE2 = re2.compile(r'\[[^\]]*\]|\([^)]*\)|<[^>]*>')
+    # Non-raw strings here: RE2 rejects \uXXXX escapes, so Python must
+    # resolve them to literal characters before the pattern is compiled
+    _ZH_SQUASH_RE2 = re2.compile('([\u4e00-\u9fff])\\s+([\u4e00-\u9fff])')
+    _ZH_BEFORE_LATIN_RE2 = re2.compile('([\u4e00-\u9fff])([a-zA-Z0-9])')
+    _LATIN_BEFORE_ZH_RE2 = re2.compile('([a-zA-Z0-9])([\u4e00-\u9fff])')
+    _JA_SQUASH_RE2 = re2.compile('([\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff])\\s+([\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff])')
+    _KO_SQUASH_RE2 = re2.compile(r'([가-힣])\s+([가-힣])')
+
+# Words that suggest a paragraph boundary when they appear in a sentence
+_PARAGRAPH_INDICATORS = ('however', 'therefore', 'moreover', 'furthermore')
+_INDICATORS_RE = re.compile('|'.join(_PARAGRAPH_INDICATORS), re.IGNORECASE)
+
+if ahocorasick is not None:
+    _INDICATOR_AUTOMATON = ahocorasick.Automaton()
+    for _word in _PARAGRAPH_INDICATORS:
+        _INDICATOR_AUTOMATON.add_word(_word, _word)
+    _INDICATOR_AUTOMATON.make_automaton()
+else:
+    _INDICATOR_AUTOMATON = None
+
+
+def _punct_spacing_repl(match: 're.Match') -> str:
+    """Replacement for _PUNCT_SPACING_RE covering both spacing fixes"""
+    if match.group(1) is not None:
+        # Whitespace before punctuation: drop it, and restore the space
+        # after the punctuation if a word character followed directly
+        if match.group(2) is not None:
+            return match.group(1) + ' ' + match.group(2)
+        return match.group(1)
+    # Punctuation glued to the next word: insert a space
+    return match.group(3) + ' ' + match.group(4)
+
+
+def _contains_indicator(sentence: str) -> bool:
+    """Check whether a sentence contains a paragraph indicator word"""
+    if _INDICATOR_AUTOMATON is not None:
+        # The automaton stores lowercase keys, so only this path pays for
+        # a lowered copy of the sentence
+        return next(_INDICATOR_AUTOMATON.iter(sentence.lower()), None) is not None
+    # Case-insensitive pattern: no per-sentence .lower() allocation
+    return _INDICATORS_RE.search(sentence) is not None
+
 
 class SubtitleCleaner:
     """Cleans and processes JSON3 subtitle files"""
 
     def __init__(self):
+        # Prefer the linear-time RE2 engine for the hot substitution patterns,
+        # falling back to the stdlib backtracking engine when re2 is absent
+        self._engine = 're2' if re2 is not None else 're'
+        if re2 is not None:
+            self._artifacts_re = _ARTIFACTS_RE2
+            self._zh_squash_re = _ZH_SQUASH_RE2
+            self._zh_before_latin_re = _ZH_BEFORE_LATIN_RE2
+            self._latin_before_zh_re = _LATIN_BEFORE_ZH_RE2
+            self._ja_squash_re = _JA_SQUASH_RE2
+            self._ko_squash_re = _KO_SQUASH_RE2
+        else:
+            self._artifacts_re = _ARTIFACTS_RE
+            self._zh_squash_re = _ZH_SQUASH_RE
+            self._zh_before_latin_re = _ZH_BEFORE_LATIN_RE
+            self._latin_before_zh_re = _LATIN_BEFORE_ZH_RE
+            self._ja_squash_re = _JA_SQUASH_RE
+            self._ko_squash_re = _KO_SQUASH_RE
+        # Language-specific substitution rules, built once and reused across
+        # files: (pattern, replacement, only applies when text has spaces)
+        self._lang_rules = {
+            'zh': (
+                (self._zh_squash_re, r'\1\2', True),
+                (self._zh_before_latin_re, r'\1 \2', False),
+                (self._latin_before_zh_re, r'\1 \2', False),
+            ),
+            'ja': (
+                (self._ja_squash_re, r'\1\2', True),
+            ),
+            'ko': (
+                (self._ko_squash_re, r'\1\2', True),
+            ),
+        }
+        # A parser instance is kept per cleaner because simdjson reuses its
+        # internal buffer between parses
+        self._json_parser = simdjson.Parser() if simdjson is not None else None
+        # Keeps the memory-mapped input alive while the lazy document built
+        # from it is still being walked
+        self._json_buffer = None
         self.stats = {
             'original_segments': 0,
             'processed_segments': 0,
@@ -53,126 +183,151 @@ class SubtitleCleaner:
     def load_json3_file(self, file_path: str) -> Dict[str, Any]:
         """Load and parse JSON3 subtitle file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                if simdjson is not None:
+                    # Memory-map the file and hand the buffer straight to the
+                    # parser: no read() copy into a Python bytes object, and
+                    # the resulting lazy document only materializes the
+                    # fields that are walked during extraction
+                    self._json_buffer = mmap.mmap(
+                        f.fileno(), 0, access=mmap.ACCESS_READ
+                    )
+                    data = self._json_parser.parse(self._json_buffer)
+                elif orjson is not None:
+                    data = orjson.loads(f.read())
+                else:
+                    data = json.loads(f.read())
 
             if 'events' not in data:
                 raise ValueError("Invalid JSON3 format: missing 'events' field")
 
-            logger.info(f"Loaded JSON3 file: {file_path}")
-            logger.info(f"Found {len(data['events'])} subtitle events")
+            logger.info("Loaded JSON3 file: %s", file_path)
+            logger.info("Found %d subtitle events", len(data['events']))
 
             return data
         except Exception as e:
-            logger.error(f"Failed to load JSON3 file {file_path}: {e}")
+            logger.error("Failed to load JSON3 file %s: %s", file_path, e)
             raise
 
-    def extract_text_segments(self, data: Dict[str, Any]) -> List[str]:
-        """Extract text segments from JSON3 events"""
-        segments = []
-        events = data.get('events', [])
+    def extract_text_segments(self, data: Dict[str, Any]) -> Iterator[str]:
+        """Yield text segments from JSON3 events as they are walked"""
+        events = data['events'] if 'events' in data else []
+        count = 0
 
         for event in events:
             if 'segs' in event:
                 for seg in event['segs']:
-                    if 'utf8' in seg and seg['utf8'].strip():
-                        segments.append(seg['utf8'].strip())
-
-        self.stats['original_segments'] = len(segments)
-        logger.info(f"Extracted {len(segments)} text segments")
-
-        return segments
-
-    def remove_duplicates(self, segments: List[str]) -> List[str]:
+                    if 'utf8' in seg:
+                        # Strip once and reuse the result for both the
+                        # emptiness check and the yielded value
+                        text = seg['utf8'].strip()
+                        if text:
+                            count += 1
+                            yield text
+
+        self.stats['original_segments'] = count
+        self.stats['processed_segments'] = count
+        logger.debug("Extracted %d text segments", count)
+
+    def remove_duplicates(self, segments: Iterable[str]) -> Iterator[str]:
         """Remove duplicate consecutive segments"""
-        if not segments:
-            return segments
-
-        cleaned = [segments[0]]
+        # groupby collapses runs of equal segments in C; yielding one
+        # segment per run keeps the pipeline streaming
         duplicates_removed = 0
+        kept = 0
 
-        for i in range(1, len(segments)):
-            if segments[i] != segments[i-1]:
-                cleaned.append(segments[i])
-            else:
-                duplicates_removed += 1
+        for segment, run in groupby(segments):
+            duplicates_removed += sum(1 for _ in run) - 1
+            kept += 1
+            yield segment
 
         self.stats['removed_duplicates'] = duplicates_removed
-        logger.info(f"Removed {duplicates_removed} duplicate segments")
-
-        return cleaned
+        self.stats['processed_segments'] = kept
+        logger.debug("Removed %d duplicate segments", duplicates_removed)
 
-    def merge_consecutive_segments(self, segments: List[str], min_length: int = 10) -> List[str]:
+    def merge_consecutive_segments(self, segments: Iterable[str], min_length: int = 10) -> Iterator[str]:
         """Merge short consecutive segments with the next one"""
-        if not segments:
-            return segments
+        # Single-segment lookahead keeps the merge streaming: only the
+        # current and next segments are held in memory at once
+        iterator = iter(segments)
+        consumed = 0
+        produced = 0
 
-        merged = []
-        i = 0
+        current = next(iterator, None)
+        if current is not None:
+            consumed += 1
 
-        while i < len(segments):
-            current = segments[i]
+        while current is not None:
+            following = next(iterator, None)
+            if following is not None:
+                consumed += 1
 
             # If current segment is too short and there's a next segment
-            if (len(current) < min_length and i + 1 < len(segments)):
+            if len(current) < min_length and following is not None:
                 # Merge with next segment
-                merged.append(current + ' ' + segments[i + 1])
-                i += 2  # Skip the next segment as it's been merged
+                produced += 1
+                yield current + ' ' + following
+                current = next(iterator, None)
+                if current is not None:
+                    consumed += 1
             else:
-                merged.append(current)
-                i += 1
+                produced += 1
+                yield current
+                current = following
 
-        logger.info(f"Merged segments from {len(segments)} to {len(merged)}")
+        self.stats['processed_segments'] = produced
+        logger.debug("Merged segments from %d to %d", consumed, produced)
 
-        return merged
-
-    def format_paragraphs(self, segments: List[str]) -> str:
-        """Format segments into paragraphs"""
-        # Simple paragraph formation based on sentence endings
-        text = ' '.join(segments)
-
-        # Ensure proper spacing around punctuation
-        text = re.sub(r'\s+([.!?])', r'\1', text)
-        text = re.sub(r'([.!?])(\w)', r'\1 \2', text)
+    def format_paragraphs(self, text: str) -> str:
+        """Format cleaned text into paragraphs"""
+        # Ensure proper spacing around punctuation (single combined pass)
+        text = _PUNCT_SPACING_RE.sub(_punct_spacing_repl, text)
 
         # Split into paragraphs (simple heuristic: two or more sentences)
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        paragraphs = []
-        current_paragraph = []
+        sentences = _SENTENCE_SPLIT_RE.split(text)
+
+        # Write sentences straight into one buffer instead of collecting
+        # per-paragraph lists and joining twice
+        buffer = io.StringIO()
+        sentences_in_paragraph = 0
+        paragraph_count = 0
 
         for sentence in sentences:
             sentence = sentence.strip()
             if sentence:
-                current_paragraph.append(sentence)
+                if sentences_in_paragraph:
+                    buffer.write(' ')
+                elif paragraph_count:
+                    buffer.write('\n\n')
+                buffer.write(sentence)
+                sentences_in_paragraph += 1
 
                 # End paragraph after 2-4 sentences or if sentence ends with common paragraph indicators
-                if (len(current_paragraph) >= 3 and
+                if (sentences_in_paragraph >= 3 and
                     (sentence.endswith(('.', '?', '!')) or
-                     any(indicator in sentence.lower() for indicator in ['however', 'therefore', 'moreover', 'furthermore']))):
-                    paragraphs.append(' '.join(current_paragraph))
-                    current_paragraph = []
+                     _contains_indicator(sentence))):
+                    paragraph_count += 1
+                    sentences_in_paragraph = 0
 
-        # Add remaining sentences
-        if current_paragraph:
-            paragraphs.append(' '.join(current_paragraph))
+        # Count the trailing unterminated paragraph
+        if sentences_in_paragraph:
+            paragraph_count += 1
 
-        result = '\n\n'.join(paragraphs)
-        logger.info(f"Formatted {len(segments)} segments into {len(paragraphs)} paragraphs")
+        result = buffer.getvalue()
+        logger.debug("Formatted %d sentences into %d paragraphs", len(sentences), paragraph_count)
 
         return result
 
     def clean_text(self, text: str, language_code: Optional[str] = None) -> str:
         """Clean and normalize text"""
-        # Remove common subtitle artifacts
-        text = re.sub(r'\[.*?\]', '', text)  # Remove bracketed text like [music]
-        text = re.sub(r'\(.*?\)', '', text)  # Remove parenthesized text
-        text = re.sub(r'<.*?>', '', text)    # Remove HTML-like tags
-
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Remove common subtitle artifacts: bracketed text like [music],
+        # parenthesized text and HTML-like tags in a single pass
+        text = self._artifacts_re.sub('', text)
 
-        # Remove extra spaces at beginning and end
-        text = text.strip()
+        # Normalize whitespace and trim the ends in one pass: split() both
+        # collapses runs of whitespace and drops leading/trailing whitespace,
+        # replacing the regex substitution plus strip() double walk
+        text = ' '.join(text.split())
 
         # Language-specific cleaning
         if language_code:
@@ -182,27 +337,28 @@ class SubtitleCleaner:
 
     def _language_specific_cleaning(self, text: str, language_code: str) -> str:
         """Apply language-specific text cleaning"""
-        if language_code == 'zh':
-            # Chinese text processing
-            # Remove unnecessary spaces between Chinese characters
-            text = re.sub(r'([\u4e00-\u9fff])\s+([\u4e00-\u9fff])', r'\1\2', text)
-            # Ensure proper spacing between Chinese and English/numbers
-            text = re.sub(r'([\u4e00-\u9fff])([a-zA-Z0-9])', r'\1 \2', text)
-            text = re.sub(r'([a-zA-Z0-9])([\u4e00-\u9fff])', r'\1 \2', text)
-
-        elif language_code == 'ja':
-            # Japanese text processing
-            # Remove unnecessary spaces between Japanese characters
-            text = re.sub(r'([\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff])\s+([\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff])', r'\1\2', text)
-
-        elif language_code == 'ko':
-            # Korean text processing
-            # Normalize Korean spacing
-            text = re.sub(r'([가-힣])\s+([가-힣])', r'\1\2', text)
+        rules = self._lang_rules.get(language_code)
+        if rules is None:
+            return text
+
+        # The space-squashing rules are contextual (a space is only dropped
+        # between two CJK characters), so they cannot be expressed as a
+        # str.translate table; instead a constant-time membership check
+        # skips the regex pass outright when there is nothing to squash
+        has_space = ' ' in text
+        for pattern, replacement, needs_space in rules:
+            if needs_space and not has_space:
+                continue
+            text = pattern.sub(replacement, text)
 
         return text
 
-    def process_file(self, input_file: str, output_file: str, **kwargs) -> Dict[str, Any]:
+    def process_file(self, input_file: str, output_file: str,
+                     remove_timestamps: bool = True,
+                     merge_duplicates: bool = True,
+                     format_paragraphs: bool = True,
+                     min_segment_length: int = 10,
+                     language_code: Optional[str] = None) -> Dict[str, Any]:
         """Process subtitle file and save cleaned text"""
         start_time = datetime.now()
 
@@ -210,32 +366,38 @@ class SubtitleCleaner:
             # Load JSON3 file
             data = self.load_json3_file(input_file)
 
-            # Extract text segments
+            # Build the lazy segment pipeline: each stage yields into the
+            # next and no intermediate segment list is materialized
             segments = self.extract_text_segments(data)
 
             # Remove duplicates if requested
-            if kwargs.get('merge_duplicates', True):
+            if merge_duplicates:
                 segments = self.remove_duplicates(segments)
 
             # Merge short segments if requested
-            min_length = kwargs.get('min_segment_length', 10)
-            if min_length > 0:
-                segments = self.merge_consecutive_segments(segments, min_length)
+            if min_segment_length > 0:
+                segments = self.merge_consecutive_segments(segments, min_segment_length)
 
-            # Format paragraphs if requested
-            if kwargs.get('format_paragraphs', True):
-                text = self.format_paragraphs(segments)
-            else:
-                text = ' '.join(segments)
+            # Clean the joined segment text first so formatting is the last
+            # step: previously clean_text ran after formatting and its
+            # whitespace normalization flattened the paragraph breaks
+            text = self.clean_text(' '.join(segments), language_code)
 
-            # Clean text
-            language_code = kwargs.get('language_code')
-            text = self.clean_text(text, language_code)
+            # Format paragraphs if requested
+            if format_paragraphs:
+                text = self.format_paragraphs(text)
 
-            # Calculate statistics
-            self.stats['processed_segments'] = len(segments)
+            # Calculate statistics (segment counts were recorded by the
+            # pipeline stages as the stream was consumed)
             self.stats['total_characters'] = len(text)
-            self.stats['total_words'] = len(text.split())
+            # clean_text collapsed all whitespace to single spaces and
+            # formatting only adds blank-line paragraph breaks, so the word
+            # count is the separator count plus one; str.count scans at
+            # C speed without allocating the word list text.split() would
+            if text:
+                self.stats['total_words'] = text.count(' ') + text.count('\n\n') + 1
+            else:
+                self.stats['total_words'] = 0
 
             # Save to output file
             self._save_output_file(output_file, text)
@@ -244,8 +406,9 @@ class SubtitleCleaner:
             end_time = datetime.now()
             self.stats['processing_time'] = (end_time - start_time).total_seconds()
 
-            logger.info(f"Processing completed in {self.stats['processing_time']:.2f} seconds")
-            logger.info(f"Output: {self.stats['total_characters']} characters, {self.stats['total_words']} words")
+            logger.info("Processing completed in %.2f seconds", self.stats['processing_time'])
+            logger.info("Output: %d characters, %d words",
+                        self.stats['total_characters'], self.stats['total_words'])
 
             return {
                 'success': True,
@@ -255,7 +418,7 @@ class SubtitleCleaner:
             }
 
         except Exception as e:
-            logger.error(f"Processing failed: {e}")
+            logger.error("Processing failed: %s", e)
             return {
                 'success': False,
                 'error': str(e),
@@ -271,10 +434,10 @@ class SubtitleCleaner:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
 
-            logger.info(f"Saved cleaned text to: {file_path}")
+            logger.info("Saved cleaned text to: %s", file_path)
 
         except Exception as e:
-            logger.error(f"Failed to save output file {file_path}: {e}")
+            logger.error("Failed to save output file %s: %s", file_path, e)
             raise
 
 
@@ -349,7 +512,7 @@ Examples:
 
     # Validate input file
     if not Path(args.input).exists():
-        logger.error(f"Input file does not exist: {args.input}")
+        logger.error("Input file does not exist: %s", args.input)
         sys.exit(1)
 
     # Create cleaner and process file
@@ -382,7 +545,7 @@ Examples:
 
         sys.exit(0)
     else:
-        logger.error(f"Processing failed: {result.get('error', 'Unknown error')}")
+        logger.error("Processing failed: %s", result.get('error', 'Unknown error'))
         sys.exit(1)
 
 